@@ -1,7 +1,7 @@
-
-from collections import deque
+from collections import Counter
 
 from mecademic_pydriver.MessageReceiver import MessageReceiver
+from mecademic_pydriver.RingLog import RingLog
 from mecademic_pydriver.parsingLib import messages2codepayload
 
 class MecademicLog:
@@ -9,7 +9,9 @@ class MecademicLog:
     Class that represents the log of all messages received from mecademic robot
 
     Attributes:
-        log: a deque of last logs received each one is a tuple (code, payload)
+        codes: a RingLog (circular buffer) with the codes of the last logs received
+        payloads: a RingLog with the payloads of the last logs received, kept in lockstep with codes
+        log: (read only) a copy of the log, a list of tuple (code, payload) (see get_log)
         log_size: maximum log size
     """
     
@@ -23,15 +25,42 @@ class MecademicLog:
                                     usefull to intercept new messages without remove them from the log
         """
         self.message_receiver = MessageReceiver(socket, "\x00")
-        self.log = deque([],log_size)
+        self.log_size = log_size
+        #the log is stored as two parallel buffers (structure of arrays)
+        #so that code searches only touch the codes
+        self.codes = RingLog(log_size)
+        self.payloads = RingLog(log_size)
+        #number of occurrences of each distinct code currently in the log
+        #used to answer searches of absent codes without scanning the log
+        #and to turn prefix searches into C-level searches of exact codes
+        self._code_counts = Counter()
+        #number of error messages (code starts with 1) currently in the log
+        self._error_count = 0
+        #True if messages were appended after the counts were last computed
+        self._counts_stale = False
         self.on_new_messages_received_cb = on_new_messages_received
 
 
+    def close(self):
+        """
+        Release the resources used to receive messages
+        The socket itself is not closed
+        """
+        self.message_receiver.close()
+
+    @property
+    def log(self):
+        """
+        Read only copy of the log as a list of tuple (code, payload), from the older
+        Kept for compatibility: the log is stored as the two buffers codes and payloads
+        """
+        return self.get_log()
+
     def get_log(self):
         """
         Get a copy of the log as a list object
         """
-        return list(self.log)
+        return list(zip(self.codes, self.payloads))
 
     def update_log(self, wait_for_new_messages=False, timeout=None):
         """
@@ -40,12 +69,16 @@ class MecademicLog:
             If True, wait for new messages
         timeout : same meaning of select.select, used only when wait_for_new_messages=True
         """
+        ready = False
         if wait_for_new_messages:
-            self.message_receiver.wait_for_new_messages(timeout)
+            ready = self.message_receiver.wait_for_new_messages(timeout)
 
+        #the whole batch is parsed before the log is touched:
+        #on a malformed message nothing is appended
         messages = messages2codepayload( 
                     self.message_receiver.get_last_messages(
-                        self.log.maxlen
+                        self.log_size,
+                        assume_ready=ready
                         )
                     )
         
@@ -54,7 +87,53 @@ class MecademicLog:
             if self.on_new_messages_received_cb:
                 self.on_new_messages_received_cb(messages)
 
-            self.log.extend(messages)
+            self._append_codepayloads(messages)
+
+    def _append_codepayloads(self, messages):
+        """
+        Internal function
+        Append a list of (code, payload) tuples to the log
+        The batch is written to the buffers with slice assignments, the code counts
+        are recomputed once at the next search (see _update_counts)
+        """
+        log_size = self.log_size
+        if not log_size or not messages:
+            return
+        if len(messages) > log_size:
+            #only the last log_size messages survive
+            messages = messages[-log_size:]
+        codes, payloads = zip(*messages)
+        self.codes.extend(codes)
+        self.payloads.extend(payloads)
+        self._counts_stale = True
+
+    def _update_counts(self):
+        """
+        Internal function
+        Recompute the code counts if messages were appended since the last search
+        """
+        if self._counts_stale:
+            self._code_counts = Counter(self.codes)
+            self._error_count = sum(
+                count for code, count in self._code_counts.items() if code[:1] == "1"
+                )
+            self._counts_stale = False
+
+    def _uncount_code(self, code):
+        """
+        Internal function
+        Update the code counts after an occurrence of code left the log
+        """
+        if self._counts_stale:
+            #the counts will be recomputed from the buffers
+            return
+        if code[:1] == "1":
+            self._error_count -= 1
+        count = self._code_counts[code] - 1
+        if count:
+            self._code_counts[code] = count
+        else:
+            del self._code_counts[code]
 
     def get_first_message(self):
         """
@@ -62,8 +141,10 @@ class MecademicLog:
         Remove the message from the log
         Return None if no message is in the log
         """
-        if self.log:
-            return self.log.popleft()
+        if self.codes:
+            message = (self.codes.popleft(), self.payloads.popleft())
+            self._uncount_code(message[0])
+            return message
         else:
             return None
 
@@ -73,8 +154,10 @@ class MecademicLog:
         Remove the message from the log
         Return None if no message is in the log
         """
-        if self.log:
-            return self.log.pop()
+        if self.codes:
+            message = (self.codes.pop(), self.payloads.pop())
+            self._uncount_code(message[0])
+            return message
         else:
             return None
 
@@ -88,32 +171,93 @@ class MecademicLog:
         delete_others : bool (Default False)
             Delete all other occurances of the same code
         """
-        message = None
-        # find message
-        for this_message in reversed(self.log):
-            if this_message[0].startswith(code):
-                message = this_message
-                break
-        #if found remove it from log
-        if message:
-            if delete_others:
-                self.remove_all_code(code)
-            else:
-                self.log.reverse()
-                self.log.remove(message)
-                self.log.reverse
+        index, = self.find_last_code_occurances((code,))
+        if index < 0:
+            return None
+        message = self.pop_message(index)
+        if delete_others:
+            self.remove_all_code(code)
+        return message
+
+    def has_errors(self):
+        """
+        Return True if an error message (code starts with 1) is in the log
+        O(1) unless messages were appended since the last search
+        """
+        self._update_counts()
+        return self._error_count > 0
+
+    def find_last_code_occurances(self, codes):
+        """
+        Find the last occurence of each of the codes in a single pass over the codes in the log
+        The log is not scanned at all if no code of the log matches
+        Return a list with the index of the last occurence of each code (-1 if not found)
+        codes : iterable of str
+            a code is found if the code in the log starts with the provided one
+        """
+        self._update_counts()
+        codes = tuple(codes)
+        indexes = [-1] * len(codes)
+        for this_code in self._code_counts:
+            this_index = -1
+            for k, code in enumerate(codes):
+                if this_code.startswith(code):
+                    if this_index < 0:
+                        # search each code of the log at most once
+                        this_index = self.codes.rindex(this_code)
+                    if this_index > indexes[k]:
+                        indexes[k] = this_index
+        return indexes
+
+    def pop_message(self, index):
+        """
+        Get the message at index (see find_last_code_occurances)
+        Remove the message from the log
+        """
+        message = (self.codes[index], self.payloads[index])
+        del self.codes[index]
+        del self.payloads[index]
+        self._uncount_code(message[0])
         return message
     
     def remove_all_code(self, code):
         """
         Remove all occurences of code in the log
         """
-        messages_to_remove = []
-        for message in self.log:
-            if message[0].startswith(code):
-                messages_to_remove.append(message)
-        for message in messages_to_remove:
-            self.log.remove(message)
+        self.remove_all_codes((code,))
+
+    def remove_all_codes(self, codes):
+        """
+        Remove all occurences of any of the codes in the log, in a single pass
+        codes : iterable of str
+            a message is removed if its code starts with any of the provided ones
+        """
+        codes = tuple(codes)
+        if not codes:
+            return
+        self._update_counts()
+        codes_to_remove = [
+            this_code for this_code in self._code_counts
+            if this_code.startswith(codes)
+            ]
+        if not codes_to_remove:
+            return
+        indexes_to_keep = [
+            index for index, this_code in enumerate(self.codes)
+            if not this_code.startswith(codes)
+            ]
+        for this_code in codes_to_remove:
+            if this_code[:1] == "1":
+                self._error_count -= self._code_counts[this_code]
+            del self._code_counts[this_code]
+        log_codes = self.codes
+        payloads = self.payloads
+        codes_to_keep = [log_codes[index] for index in indexes_to_keep]
+        payloads_to_keep = [payloads[index] for index in indexes_to_keep]
+        log_codes.clear()
+        payloads.clear()
+        log_codes.extend(codes_to_keep)
+        payloads.extend(payloads_to_keep)
 
     def get_all_messages(self,code):
         """
@@ -121,7 +265,7 @@ class MecademicLog:
         Clear the log
         return [] if the log is empty
         """
-        messages = list(self.log)
+        messages = self.get_log()
         self.clear_log()
         return messages
 
@@ -129,4 +273,8 @@ class MecademicLog:
         """
         Clear all messages from the log
         """
-        self.log.clear()
\ No newline at end of file
+        self.codes.clear()
+        self.payloads.clear()
+        self._code_counts.clear()
+        self._error_count = 0
+        self._counts_stale = False
\ No newline at end of file
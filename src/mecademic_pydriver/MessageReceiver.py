@@ -1,31 +1,66 @@
-import select
+import selectors
+from collections import deque
+from itertools import islice
 
 
 class MessageReceiver:
     """
     Class to handle messages over socket using a message_terminator
+    The messages (without terminator) are returned as str if decode is True,
+    as raw bytes otherwise, so that a bytes consumer (e.g. the feedback) never pays for decoding
     """
 
-    def __init__(self,socket, message_terminator="\x00"):
+    def __init__(self,socket, message_terminator="\x00", decode=True, buffer_size=65536):
         """
         Constructor
         socket : socket to use
-        message_terminator : terminator of the message
+        message_terminator : terminator of the message (str or bytes)
+        decode : bool (default True)
+            If true: messages are ASCII decoded to str
+            If false: messages are returned as raw bytes (no decoding cost)
+        buffer_size : int (default 65536)
+            initial size of the receive buffer (it grows if a message does not fit)
         """
         self.socket = socket
-        self.buffer = ""
-        self.messages = []
+        #preallocated receive buffer: data is received in place with recv_into
+        #the received bytes not yet parsed are buffer[_head:_tail]
+        self.buffer = bytearray(buffer_size)
+        self._view = memoryview(self.buffer)
+        self._head = 0
+        self._tail = 0
+        self.messages = deque()
         self.message_terminator = message_terminator
+        self.decode = decode
+        if isinstance(message_terminator, str):
+            message_terminator = message_terminator.encode("ascii")
+        #the terminator is searched as bytes in the raw buffer (bytes.find, memchr in C)
+        self._terminator_byte = bytes(message_terminator)
+        #index of the buffer where the next terminator scan starts
+        #(the bytes before it were already scanned without finding a terminator)
+        self._scan_start = 0
+        #persistent selector (epoll/poll/select, the best available), registered once
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.socket, selectors.EVENT_READ)
+
+    def close(self):
+        """
+        Release the selector used to poll the socket
+        The socket itself is not closed
+        """
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
 
     def wait_for_new_messages(self, timeout=None):
         """
         Wait for new messages in the socket
         timeout : same meaning of select.select
+        return: True if the socket is ready for reading, False on timeout
         """
         if timeout:
-            _, _, _ = select.select([self.socket], [], [], timeout)
+            return bool(self._selector.select(timeout))
         else:
-            _, _, _ = select.select([self.socket], [], [])
+            return bool(self._selector.select())
 
     def bytes_available(self):
         """
@@ -39,8 +74,7 @@ class MessageReceiver:
         # or 
         # 3) the socket is closed or reset 
         #   (in this case, recv will return an empty string).
-        rlist, _, _ = select.select([self.socket], [], [], 0) #0=poll
-        if not rlist:
+        if not self._selector.select(0): #0=poll
             return False
         else:
             return True
@@ -49,39 +83,78 @@ class MessageReceiver:
         """
         Internal function
         Receive bytes from socket and add them in the buffer
+        return: number of bytes received
+        May raise the builtin ConnectionError if the other side has closed the socket
         """
-        #recv data from socket
-        local_buffer = self.socket.recv(bufsize).decode("ascii")
-        if len(local_buffer) == 0:
+        self.__reserve(bufsize)
+
+        #recv data from socket directly at the end of the buffer
+        #(raw bytes, decoded only once a message is complete)
+        nbytes = self.socket.recv_into(self._view[self._tail:self._tail+bufsize])
+        if nbytes == 0:
             #The other side has shut down the socket. 
             #You'll get 0 bytes of data. 
             #0 means you will never get more data on that socket. 
             #But if you keep asking for data, you'll keep getting 0 bytes.
             raise ConnectionError("messageReceiver::recv : received a zero-len buffer")
         
-        #update the local buffer
-        self.buffer += local_buffer
+        self._tail += nbytes
+
+        return nbytes
+
+    def __reserve(self, nbytes):
+        """
+        Internal function
+        Make room for nbytes at the end of the buffer
+        The pending bytes are moved at the start of the buffer, the buffer grows only if they still do not fit
+        """
+        if len(self.buffer) - self._tail >= nbytes:
+            return
+        pending = self._tail - self._head
+        if self._head:
+            self.buffer[:pending] = self.buffer[self._head:self._tail]
+            self._scan_start -= self._head
+            self._head = 0
+            self._tail = pending
+        if len(self.buffer) - pending < nbytes:
+            #a resize is not allowed while the memoryview is alive
+            self._view.release()
+            self.buffer.extend(bytes(nbytes - (len(self.buffer) - pending)))
+            self._view = memoryview(self.buffer)
         
-    def recv(self,bufsize=4096):
+    def recv(self,bufsize=4096, assume_ready=False):
         """
         Recv msg from socket, update buffer and messages
         return: number of messages in the queue
+        assume_ready : bool (default False)
+            If true: the socket is known to be ready for reading (e.g. wait_for_new_messages returned True)
+            and the poll before recv is skipped
         """
 
         #check if socket is available for reading
-        if(not self.bytes_available()):
+        if(not assume_ready and not self.bytes_available()):
             return len(self.messages)
 
         self.__recv_internal(bufsize)
 
         return self.parse_buffer()
 
-    def recv_all(self,bufsize=4096):
+    def recv_all(self,bufsize=4096, assume_ready=False):
         """
         receive and parse all messages from the socket
+        assume_ready : bool (default False)
+            If true: the socket is known to be ready for reading (e.g. wait_for_new_messages returned True)
+            and the first poll is skipped
         """
+        if assume_ready:
+            if self.__recv_internal(bufsize) < bufsize:
+                return self.parse_buffer()
+
         while(self.bytes_available()):
-            self.__recv_internal(bufsize)
+            #a short read means that the socket has been drained:
+            #skip the extra poll that would only report no data
+            if self.__recv_internal(bufsize) < bufsize:
+                break
         
         return self.parse_buffer()
 
@@ -90,16 +163,29 @@ class MessageReceiver:
         parse the buffer and append new messages to self.messages
         return: number of messages in the queue
         """
-        while len(self.buffer) is not 0:
+        terminator = self._terminator_byte
 
-            msg, ignored, self.buffer = self.buffer.partition(self.message_terminator)
-            if not ignored:
-                # if not terminator char, reappend msg in baffer (last message was not compleately received)
-                self.buffer = msg + self.buffer
-                break
-
-            #append parsed message to messages
-            self.messages.append(msg)
+        #resume the scan where the previous call stopped, looking for the last terminator
+        #(rfind and split run in C, a single byte terminator is searched with memchr)
+        last = self.buffer.rfind(terminator, self._scan_start, self._tail)
+        if last >= 0:
+            #split all the complete messages in a single pass
+            parts = bytes(self._view[self._head:last]).split(terminator)
+            #consume the messages before decoding them, so that a frame that fails to decode
+            #is dropped with its error instead of being parsed again on every later call
+            #the remaining bytes are a message not compleately received
+            self._head = last + len(terminator)
+            if self._head == self._tail:
+                self._head = self._tail = 0
+            self._scan_start = max(self._head, self._tail - len(terminator) + 1)
+            if self.decode:
+                #decode only the complete messages
+                self.messages.extend([part.decode("ascii") for part in parts])
+            else:
+                self.messages.extend(parts)
+        else:
+            # remember the scanned bytes of the incomplete message so they are not scanned again
+            self._scan_start = max(self._head, self._tail - len(terminator) + 1)
 
         return len(self.messages)
 
@@ -108,8 +194,9 @@ class MessageReceiver:
         Clean the recv buffer and stored messages
         """
         self.recv_all()
-        self.buffer = ""
-        self.messages= []
+        self._head = self._tail = 0
+        self._scan_start = 0
+        self.messages.clear()
 
     def get_message(self, recv=True):
         """
@@ -122,7 +209,7 @@ class MessageReceiver:
             self.recv()
 
         if self.messages:
-            return self.messages.pop(0)
+            return self.messages.popleft()
         else:
             return None
 
@@ -137,8 +224,8 @@ class MessageReceiver:
         if recv_all:
             self.recv_all()
 
-        messages = self.messages
-        self.messages = []
+        messages = list(self.messages)
+        self.messages.clear()
         return messages
 
     def get_last_message(self, recv_all=True, discard_previous_msgs=True):
@@ -154,14 +241,14 @@ class MessageReceiver:
             self.recv_all()
 
         if self.messages:
-            msg = self.messages.pop(-1)
+            msg = self.messages.pop()
             if discard_previous_msgs:
-                self.messages = []
+                self.messages.clear()
             return msg
         else:
             return None
 
-    def get_last_messages(self, num_messages, recv_all=True, discard_previous_msgs=True):
+    def get_last_messages(self, num_messages, recv_all=True, discard_previous_msgs=True, assume_ready=False):
         """
         Get the last num_messages messages in the queue
         Messages are ordered starting from the older
@@ -171,20 +258,38 @@ class MessageReceiver:
             If true: call self.recv_all()
         discard_previous_msgs: bool (default True)
             Clear other messages
+        assume_ready : bool (default False)
+            Passed to self.recv_all()
         """
         if recv_all:
-            self.recv_all()
+            self.recv_all(assume_ready=assume_ready)
 
-        messages = []
-        for _ in range(0,num_messages):
-            if self.messages:
-                messages.append( self.messages.pop(-1) )
-            else:
-                break
+        if discard_previous_msgs:
+            #copy the tail of the queue in one pass, then drop everything
+            messages = list(islice(self.messages, max(0, len(self.messages) - num_messages), None))
+            self.messages.clear()
+            return messages
 
+        pop = self.messages.pop
+        messages = [pop() for _ in range(min(num_messages, len(self.messages)))]
         messages.reverse()
-        
-        if discard_previous_msgs:
-            self.messages = []
 
         return messages
+
+    def iter_last_messages(self, num_messages, recv_all=True, assume_ready=False):
+        """
+        Iterate over the last num_messages messages in the queue, then clear the queue
+        Messages are ordered starting from the newer (no list is built)
+        The queue is detached before the iteration, so new messages are not affected
+        recv_all : bool (default True)
+            If true: call self.recv_all()
+        assume_ready : bool (default False)
+            Passed to self.recv_all()
+        return: an iterator over the messages
+        """
+        if recv_all:
+            self.recv_all(assume_ready=assume_ready)
+
+        messages = self.messages
+        self.messages = deque()
+        return islice(reversed(messages), num_messages)
@@ -0,0 +1,154 @@
+from itertools import chain
+
+
+class RingLog:
+    """
+    Fixed capacity circular buffer over a preallocated list
+    It behaves like a deque with maxlen: when full, appending a new item drops the oldest one
+
+    Attributes:
+        maxlen: maximum number of items stored
+    """
+
+    def __init__(self, maxlen):
+        """
+        Constructor
+        maxlen: (int) the capacity of the buffer
+        """
+        self.maxlen = maxlen
+        self._buf = [None] * maxlen
+        self._head = 0 #index of the oldest item
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def _segments(self):
+        """
+        Internal function
+        Return the stored items as one or two contiguous list slices, from the oldest
+        """
+        end = self._head + self._len
+        if end <= self.maxlen:
+            return (self._buf[self._head:end],)
+        return (self._buf[self._head:], self._buf[:end - self.maxlen])
+
+    def _index(self, index):
+        """
+        Internal function
+        Convert a (possibly negative) logical index in an index of the underlying list
+        """
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("RingLog index out of range")
+        return (self._head + index) % self.maxlen
+
+    def __getitem__(self, index):
+        return self._buf[self._index(index)]
+
+    def __delitem__(self, index):
+        """
+        Delete an item, shifting the following ones (O(n))
+        """
+        index = self._index(index) - self._head
+        if index < 0:
+            index += self.maxlen
+        buf = self._buf
+        maxlen = self.maxlen
+        for k in range(index, self._len - 1):
+            buf[(self._head + k) % maxlen] = buf[(self._head + k + 1) % maxlen]
+        self._len -= 1
+        buf[(self._head + self._len) % maxlen] = None
+
+    def __iter__(self):
+        return chain(*self._segments())
+
+    def __reversed__(self):
+        return chain(*(reversed(segment) for segment in reversed(self._segments())))
+
+    def rindex(self, value):
+        """
+        Return the (non negative) index of the last occurrence of value
+        The search runs in C over the contiguous slices of the buffer
+        Raise ValueError if value is not present
+        """
+        end = self._len
+        for segment in reversed(self._segments()):
+            end -= len(segment)
+            try:
+                return end + len(segment) - 1 - segment[::-1].index(value)
+            except ValueError:
+                pass
+        raise ValueError("RingLog.rindex(x): x not in RingLog")
+
+    def append(self, item):
+        """
+        Append an item, dropping the oldest one if the buffer is full
+        """
+        if not self.maxlen:
+            return
+        if self._len == self.maxlen:
+            self._buf[self._head] = item
+            self._head = (self._head + 1) % self.maxlen
+        else:
+            self._buf[(self._head + self._len) % self.maxlen] = item
+            self._len += 1
+
+    def extend(self, items):
+        """
+        Append all items, dropping the oldest ones if the buffer is full
+        The items are written with at most two slice assignments
+        """
+        maxlen = self.maxlen
+        if not maxlen:
+            return
+        items = list(items)
+        if len(items) > maxlen:
+            #only the last maxlen items can be stored
+            items = items[-maxlen:]
+        num_items = len(items)
+        num_dropped = max(0, self._len + num_items - maxlen)
+        #the items are written after the newest one, overwriting the dropped oldest ones
+        start = (self._head + self._len) % maxlen
+        end = start + num_items
+        buf = self._buf
+        if end <= maxlen:
+            buf[start:end] = items
+        else:
+            buf[start:] = items[:maxlen - start]
+            buf[:end - maxlen] = items[maxlen - start:]
+        self._head = (self._head + num_dropped) % maxlen
+        self._len += num_items - num_dropped
+
+    def popleft(self):
+        """
+        Remove and return the oldest item
+        """
+        if not self._len:
+            raise IndexError("pop from an empty RingLog")
+        item = self._buf[self._head]
+        self._buf[self._head] = None
+        self._head = (self._head + 1) % self.maxlen
+        self._len -= 1
+        return item
+
+    def pop(self):
+        """
+        Remove and return the newest item
+        """
+        if not self._len:
+            raise IndexError("pop from an empty RingLog")
+        self._len -= 1
+        index = (self._head + self._len) % self.maxlen
+        item = self._buf[index]
+        self._buf[index] = None
+        return item
+
+    def clear(self):
+        """
+        Remove all items
+        """
+        self._buf = [None] * self.maxlen
+        self._head = 0
+        self._len = 0
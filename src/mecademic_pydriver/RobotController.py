@@ -1,8 +1,8 @@
-import socket
-import time
+from itertools import chain
 
 from mecademic_pydriver.MecademicLog import MecademicLog
-from mecademic_pydriver.parsingLib import payload2tuple, build_command
+from mecademic_pydriver.parsingLib import payload2conf, payload2robot_status, payload2status_robot, build_command
+from mecademic_pydriver.socketLib import connect_socket
 
 class RobotController:
     """Class for the Mecademic Robot allowing for communication and control of the 
@@ -15,23 +15,50 @@ class RobotController:
         End of Movement: Setting for EOM reply
         Error: Error Status of the Mecademic Robot
     """
+
+    #pre-encoded "Name(" prefixes of the motion commands with arguments
+    _CMD_PREFIX = {
+        name: (name + "(").encode("ascii")
+        for name in (
+            "MoveJoints", "MoveLin", "MoveLinRelTRF", "MoveLinRelWRF", "MovePose",
+            "SetAutoConf", "SetBlending", "SetCartAcc", "SetCartAngVel", "SetCartLinVel",
+            "SetConf", "SetJointAcc", "SetJointVel", "SetTRF", "SetWRF",
+            )
+        }
+
+    #max bytes sent with a single sendall by MoveJointsBatch (a chunk always ends on a command boundary)
+    _TX_BATCH_CHUNK_SIZE = 4096
+
+    #valid ranges of the single argument Set* commands: (lo, hi, lo_inclusive, hi_inclusive)
+    _RANGES = {
+        "SetBlending": (0, 100, True, True),
+        "SetCartAcc": (1, 100, False, True),
+        "SetCartAngVel": (0.001, 180, True, True),
+        "SetCartLinVel": (0.001, 500, True, True),
+        "SetJointAcc": (1, 100, True, True),
+        "SetJointVel": (0, 100, True, True),
+        }
+
     def __init__(
         self, 
         address, 
         socket_timeout=0.1,
         motion_commands_response_timeout=0.001,
         log_size=100, 
-        on_new_messages_received=None
+        on_new_messages_received=None,
+        busy_poll_us=0
         ):
         """Constructor for an instance of the Class Mecademic Robot 
 
         :param address: The IP address associated to the Mecademic Robot
+        :param busy_poll_us: busy poll time in microseconds for the socket receives, 0 to disable (linux only)
         """
         self.address = address
         self.port = 10000
 
         self.socket = None
         self.socket_timeout = socket_timeout
+        self.busy_poll_us = busy_poll_us
 
         self.motion_commands_response_timeout = motion_commands_response_timeout
 
@@ -50,14 +77,12 @@ class RobotController:
             return #already conencted
 
         #create a socket and connect
-        self.socket = socket.socket()
-        self.socket.settimeout(self.socket_timeout)
-        self.socket.connect((self.address, self.port))
-        self.socket.settimeout(self.socket_timeout)
-
-        #check that socket is not connected to nothing
-        if self.socket is None:          
-            raise RuntimeError( "RobotFeedback::Connect - socket is None" )
+        self.socket = connect_socket(
+                        self.address,
+                        self.port,
+                        self.socket_timeout,
+                        busy_poll_us=self.busy_poll_us
+                        )
 
         self.mecademic_log = MecademicLog(
                                 self.socket, 
@@ -72,12 +97,15 @@ class RobotController:
         self.handle_errors(method_str="connect")
 
         #check if message 3000
-        self.check_response(["3000"], method_str="check_reconnectsponse")
+        self.check_response(("3000",), method_str="check_reconnectsponse")
 
     def disconnect(self):
         """
         Disconnects Mecademic Robot object from physical Mecademic Robot
         """
+        if(self.mecademic_log is not None):
+            self.mecademic_log.close()
+            self.mecademic_log = None
         if(self.socket is not None):
             self.socket.close()
             self.socket = None
@@ -119,6 +147,9 @@ class RobotController:
         delete_others: bool (Default False)
             if True, delete all errors from the log
         """
+        #fast path: no error in the log
+        if not self.mecademic_log.has_errors():
+            return
         error_msg = self.mecademic_log.get_last_code_occurance(
                             "1", # error code starts with 1
                             delete_others = False
@@ -135,26 +166,37 @@ class RobotController:
         May raise exceptions
         This function does not check if robot is in error
         """
-        command = cmd + '\0'
-        self.socket.sendall(command.encode("ascii"))
+        self.socket.sendall(cmd.encode("ascii") + b"\0")
+
+    def send_bytes_command(self, prefix, args):
+        """
+        Sends a command with arguments to the physical Mecademic Robot
+
+        :param prefix: pre-encoded command name and open bracket, e.g. b"MoveJoints("  (bytes)
+        :param args: arguments of the command (iterable)
+
+        May raise exceptions
+        This function does not check if robot is in error
+        """
+        self.socket.sendall(prefix + ",".join(map(str, args)).encode("ascii") + b")\0")
 
     def send_command_handled(
                             self,
                             cmd,
                             method_str="send_command_handled",
-                            codes_to_remove_from_log=[],
-                            errors_code=[],
-                            responses_code=[],
+                            codes_to_remove_from_log=(),
+                            errors_code=(),
+                            responses_code=(),
                             handle_all_errors=True,
                             wait_for_new_messages=True, timeout=None
                             ):
         """
         Send a command and handle errors
-        codes_to_remove_from_log: [str]
+        codes_to_remove_from_log: (str,)
             remove this codes from the log before
-        error_codes : [str]
+        error_codes : (str,)
             command specific error codes - if any of this code is returned, raises an error
-        responses_codes : [str]
+        responses_codes : (str,)
             responses of the command - raises an error if not found
         handle_all_errors: bool (Default True)
             If true - raises an error on any error (code starts with 1)
@@ -165,8 +207,7 @@ class RobotController:
         #Update Log in Polling mode, remove all message with code in [codes_to_remove_from_log]
         #This is useful to forget errors that will be cleared by this command
         self.mecademic_log.update_log(wait_for_new_messages=False)
-        for code in codes_to_remove_from_log:
-            self.mecademic_log.remove_all_code(code)
+        self.mecademic_log.remove_all_codes(codes_to_remove_from_log)
 
         #send the command
         self.send_string_command(cmd)
@@ -200,9 +241,9 @@ class RobotController:
         self.send_command_handled(
             "ActivateRobot",
             method_str="ActivateRobot",
-            codes_to_remove_from_log=["1005"],
-            errors_code=["1013"],
-            responses_code=["2000","2001"])
+            codes_to_remove_from_log=("1005",),
+            errors_code=("1013",),
+            responses_code=("2000","2001"))
 
     def ClearMotion(self):
         """
@@ -211,8 +252,7 @@ class RobotController:
         self.send_command_handled(
             "ClearMotion",
             method_str="ClearMotion",
-            errors_code=[],
-            responses_code=["2044"])
+            responses_code=("2044",))
 
     def DeactivateRobot(self):
         """
@@ -221,9 +261,8 @@ class RobotController:
         self.send_command_handled(
             "DeactivateRobot",
             method_str="DeactivateRobot",
-            codes_to_remove_from_log=["1005"],
-            errors_code=[],
-            responses_code=["2004"])
+            codes_to_remove_from_log=("1005",),
+            responses_code=("2004",))
 
     def GetConf(self, retry=True):
         """
@@ -232,58 +271,72 @@ class RobotController:
             If no response, Retry one time
         Return a dictionary {'c1':c1,'c3':c3,'c5':c5}
         """
-        #not handle any error!
-        #send command
-        self.send_string_command("GetConf")
-        #update the log
-        self.mecademic_log.update_log(wait_for_new_messages=True)
-
-        self.handle_errors(method_str="GetConf")
-
-        msg = self.mecademic_log.get_last_code_occurance(
-                                "2029", 
-                                delete_others = True
+        msg = self.get_request_response(
+                                "GetConf",
+                                "2029",
+                                method_str="GetConf",
+                                handle_all_errors=True,
+                                retry=retry
                                 )
-        if (not msg) and retry:
-            print("[WARNING] RobotController::GetConf response not received, retry...")
-            return self.GetConf(retry=False)
-        conf = payload2tuple(msg[1], output_type = int)
-        return {
-            "c1": conf[0],
-            "c3": conf[1],
-            "c5": conf[2]
-        }
+        return payload2conf(msg[1])
 
-    def GetStatusRobot(self, retry=True):
+    def GetStatusRobot(self, retry=True, as_namedtuple=False):
         """
         Call the GetStatusRobot request command
         retry : bool (Default True)
             If no response, Retry one time
+        as_namedtuple : bool (Default False)
+            If true, return an immutable RobotStatus namedtuple (as_, hs, ... , eom) instead of a dictionary
+            no dictionary is built, usefull when the status is polled often
         Return a dictionary {'as':as,'hs':hs, ... , 'eom':eom}
         """
         #not handle any error!
+        msg = self.get_request_response(
+                                "GetStatusRobot",
+                                "2007",
+                                method_str="GetStatusRobot",
+                                handle_all_errors=False,
+                                retry=retry
+                                )
+        if as_namedtuple:
+            return payload2robot_status(msg[1])
+        return payload2status_robot(msg[1])
+
+    def get_request_response(self, cmd, response_code, method_str="get_request_response", handle_all_errors=True, retry=True):
+        """
+        Send a request command and get its response
+        The errors and the response are searched in a single pass over the log
+        response_code : str
+            the code of the response, all its occurences are removed from the log
+        handle_all_errors: bool (Default True)
+            If true - raises an error on any error (code starts with 1)
+        retry : bool (Default True)
+            If no response, Retry one time
+        Return the response message (code, payload)
+        """
         #send command
-        self.send_string_command("GetStatusRobot")
+        self.send_string_command(cmd)
         #update the log
         self.mecademic_log.update_log(wait_for_new_messages=True)
 
-        msg = self.mecademic_log.get_last_code_occurance(
-                                "2007", 
-                                delete_others = True
+        if handle_all_errors and self.mecademic_log.has_errors():
+            error_index, response_index = self.mecademic_log.find_last_code_occurances(
+                                ("1", response_code) # error code starts with 1
                                 )
-        if (not msg) and retry:
-            print("[WARNING] RobotController::GetStatusRobot response not received, retry...")
-            return self.GetStatusRobot(retry=False)
-        status = payload2tuple(msg[1], output_type = int)
-        return {
-            "as": status[0],
-            "hs": status[1],
-            "sm": status[2],
-            "es": status[3],
-            "pm": status[4],
-            "eob": status[5],
-            "eom": status[6]
-        }
+            if error_index >= 0:
+                error_msg = self.mecademic_log.pop_message(error_index)
+                raise RuntimeError("RobotController::{} {}".format(method_str,error_msg))
+        else:
+            response_index, = self.mecademic_log.find_last_code_occurances((response_code,))
+
+        if response_index < 0:
+            if retry:
+                print("[WARNING] RobotController::{} response not received, retry...".format(method_str))
+                return self.get_request_response(cmd, response_code, method_str, handle_all_errors, retry=False)
+            return None
+        msg = self.mecademic_log.pop_message(response_index)
+        self.mecademic_log.remove_all_code(response_code)
+        return msg
 
     def Home(self):
         """
@@ -292,9 +345,9 @@ class RobotController:
         self.send_command_handled(
             "Home",
             method_str="Home",
-            codes_to_remove_from_log=["1006"],
-            errors_code=["1014"],
-            responses_code=["2002","2003"])
+            codes_to_remove_from_log=("1006",),
+            errors_code=("1014",),
+            responses_code=("2002","2003"))
 
     def ResetError(self):
         """
@@ -304,10 +357,10 @@ class RobotController:
         self.send_command_handled(
             "ResetError",
             method_str="ResetError",
-            codes_to_remove_from_log=["1"],
-            errors_code=["1025"],
+            codes_to_remove_from_log=("1",),
+            errors_code=("1025",),
             handle_all_errors=False,
-            responses_code=["2005","2006"])
+            responses_code=("2005","2006"))
         self.mecademic_log.update_log(wait_for_new_messages=False)
         self.mecademic_log.remove_all_code("1")
 
@@ -318,18 +371,16 @@ class RobotController:
         self.send_command_handled(
             "ResumeMotion",
             method_str="ResumeMotion",
-            errors_code=[],
-            responses_code=["2043"])
+            responses_code=("2043",))
 
     def SetEOB(self,e):
         """
         Call the SetEOB request command
         """
-        responses_code=[]
         if e == 0:
-            responses_code = ["2055"]
+            responses_code = ("2055",)
         elif e == 1:
-            responses_code = ["2054"]
+            responses_code = ("2054",)
         else:
             raise ValueError("RobotController::SetEOB invalid argument e={}".format(e))
 
@@ -337,18 +388,16 @@ class RobotController:
         self.send_command_handled(
             cmd,
             method_str="cmd",
-            errors_code=[],
             responses_code=responses_code)
 
     def SetEOM(self,e):
         """
         Call the SetEOM request command
         """
-        responses_code=[]
         if e == 0:
-            responses_code = ["2053"]
+            responses_code = ("2053",)
         elif e == 1:
-            responses_code = ["2052"]
+            responses_code = ("2052",)
         else:
             raise ValueError("RobotController::SetEOM invalid argument e={}".format(e))
 
@@ -356,13 +405,23 @@ class RobotController:
         self.send_command_handled(
             cmd,
             method_str="cmd",
-            errors_code=[],
             responses_code=responses_code)
 
     ################################################
     ###     MOTION COMMANDS                    #####
     ################################################
 
+    def check_range(self, method_str, value_str, value):
+        """
+        Check that value is in the valid range of the method_str command (see _RANGES)
+        Raise ValueError if not
+        value_str : name of the value, used in the error message
+        """
+        lo, hi, lo_inclusive, hi_inclusive = self._RANGES[method_str]
+        if not ((lo <= value if lo_inclusive else lo < value)
+                and (value <= hi if hi_inclusive else value < hi)):
+            raise ValueError("RobotController::{} invalid value {}={}".format(method_str, value_str, value))
+
     def update_log_for_motion_commands(self):
         """
         Update the log for the motion commands in a non bloking fashion
@@ -377,9 +436,43 @@ class RobotController:
         """
         if not len(joints)==6:
             raise ValueError("RobotController::MoveJoints Meca500 has 6 joints {} provided".format(len(joints)))
-        self.send_string_command(build_command("MoveJoints",joints))
+        self.send_bytes_command(self._CMD_PREFIX["MoveJoints"],joints)
         self.update_log_for_motion_commands()
-        
+
+    def MoveJointsBatch(self, joints_sequence):
+        """
+        Call the MoveJoints Motion Command for each joints list of the sequence
+        joints_sequence: iterable of joints lists [A1,A2,...,A6] in [deg] (e.g. a planned trajectory)
+        all the joints lists are validated before sending anything
+        the commands are sent in chunks of whole commands (at most _TX_BATCH_CHUNK_SIZE bytes,
+        or a single command), with one sendall per chunk, the log is updated once at the end
+        the socket timeout applies to each chunk: if it expires, only the commands of the chunk
+        being sent can be partially transmitted
+        this methods does not check the response
+        """
+        prefix = self._CMD_PREFIX["MoveJoints"]
+        commands = []
+        for joints in joints_sequence:
+            if not len(joints)==6:
+                raise ValueError("RobotController::MoveJointsBatch Meca500 has 6 joints {} provided".format(len(joints)))
+            commands.append(",".join(map(str, joints)).encode("ascii"))
+        if not commands:
+            return
+        parts = []
+        length = 0
+        for args in commands:
+            command_length = len(prefix) + len(args) + 2
+            if parts and length + command_length > self._TX_BATCH_CHUNK_SIZE:
+                self.socket.sendall(b"".join(parts))
+                parts = []
+                length = 0
+            parts.append(prefix)
+            parts.append(args)
+            parts.append(b")\0")
+            length += command_length
+        self.socket.sendall(b"".join(parts))
+        self.update_log_for_motion_commands()
+
 
     def MoveLin(self, position, orientation):
         """
@@ -393,9 +486,7 @@ class RobotController:
         if not len(orientation)==3:
             raise ValueError("RobotController::MoveLin orientation must have len=3, {} provided".format(len(orientation)))
         
-        args = list(position)
-        args.extend(orientation)
-        self.send_string_command(build_command("MoveLin",args))
+        self.send_bytes_command(self._CMD_PREFIX["MoveLin"],chain(position, orientation))
         self.update_log_for_motion_commands()
 
     def MoveLinRelTRF(self, position, orientation):
@@ -410,9 +501,7 @@ class RobotController:
         if not len(orientation)==3:
             raise ValueError("RobotController::MoveLinRelTRF orientation must have len=3, {} provided".format(len(orientation)))
         
-        args = list(position)
-        args.extend(orientation)
-        self.send_string_command(build_command("MoveLinRelTRF",args))
+        self.send_bytes_command(self._CMD_PREFIX["MoveLinRelTRF"],chain(position, orientation))
         self.update_log_for_motion_commands()
 
     def MoveLinRelWRF(self, position, orientation):
@@ -427,9 +516,7 @@ class RobotController:
         if not len(orientation)==3:
             raise ValueError("RobotController::MoveLinRelWRF orientation must have len=3, {} provided".format(len(orientation)))
         
-        args = list(position)
-        args.extend(orientation)
-        self.send_string_command(build_command("MoveLinRelWRF",args))
+        self.send_bytes_command(self._CMD_PREFIX["MoveLinRelWRF"],chain(position, orientation))
         self.update_log_for_motion_commands()
 
     def MovePose(self, position, orientation):
@@ -444,9 +531,7 @@ class RobotController:
         if not len(orientation)==3:
             raise ValueError("RobotController::MovePose orientation must have len=3, {} provided".format(len(orientation)))
         
-        args = list(position)
-        args.extend(orientation)
-        self.send_string_command(build_command("MovePose",args))
+        self.send_bytes_command(self._CMD_PREFIX["MovePose"],chain(position, orientation))
         self.update_log_for_motion_commands()
 
     def SetAutoConf(self,e):
@@ -454,9 +539,9 @@ class RobotController:
         Call the SetAutoConf Motion Command
         this methods does not check the response
         """
-        if e is not 0 and e is not 1:
+        if e not in (0, 1):
             raise ValueError("RobotController::SetAutoConf invalid value e={}".format(e))
-        self.send_string_command(build_command("SetAutoConf",[e]))
+        self.send_bytes_command(self._CMD_PREFIX["SetAutoConf"],[e])
         self.update_log_for_motion_commands()
 
     def SetBlending(self,p):
@@ -464,9 +549,8 @@ class RobotController:
         Call the SetBlending Motion Command
         this methods does not check the response
         """
-        if not (p>=0 and p<=100):
-            raise ValueError("RobotController::SetBlending invalid value p={}".format(p))
-        self.send_string_command(build_command("SetBlending",[p]))
+        self.check_range("SetBlending", "p", p)
+        self.send_bytes_command(self._CMD_PREFIX["SetBlending"],[p])
         self.update_log_for_motion_commands()
 
     def SetCartAcc(self,p):
@@ -474,9 +558,8 @@ class RobotController:
         Call the SetCartAcc Motion Command
         this methods does not check the response
         """
-        if not (p>1 and p<=100):
-            raise ValueError("RobotController::SetCartAcc invalid value p={}".format(p))
-        self.send_string_command(build_command("SetCartAcc",[p]))
+        self.check_range("SetCartAcc", "p", p)
+        self.send_bytes_command(self._CMD_PREFIX["SetCartAcc"],[p])
         self.update_log_for_motion_commands()
 
     def SetCartAngVel(self,omega):
@@ -484,9 +567,8 @@ class RobotController:
         Call the SetCartAngVel Motion Command
         this methods does not check the response
         """
-        if not (omega>=0.001 and omega<=180):
-            raise ValueError("RobotController::SetCartAngVel invalid value omega={}".format(omega))
-        self.send_string_command(build_command("SetCartAngVel",[omega]))
+        self.check_range("SetCartAngVel", "omega", omega)
+        self.send_bytes_command(self._CMD_PREFIX["SetCartAngVel"],[omega])
         self.update_log_for_motion_commands()
 
     def SetCartLinVel(self,v):
@@ -494,9 +576,8 @@ class RobotController:
         Call the SetCartLinVel Motion Command [mm/s]
         this methods does not check the response
         """
-        if not (v>=0.001 and v<=500): 
-            raise ValueError("RobotController::SetCartLinVel invalid value v={}".format(v))
-        self.send_string_command(build_command("SetCartLinVel",[v]))
+        self.check_range("SetCartLinVel", "v", v)
+        self.send_bytes_command(self._CMD_PREFIX["SetCartLinVel"],[v])
         self.update_log_for_motion_commands()
 
     def SetConf(self,c1,c3,c5):
@@ -504,13 +585,13 @@ class RobotController:
         Call the SetConf Motion Command
         this methods does not check the response
         """
-        if c1 is not -1 and c1 is not 1:
+        if c1 not in (-1, 1):
             raise ValueError("RobotController::SetConf invalid value c1={}".format(c1))
-        if c3 is not -1 and c3 is not 1:
+        if c3 not in (-1, 1):
             raise ValueError("RobotController::SetConf invalid value c3={}".format(c3))
-        if c5 is not -1 and c5 is not 1:
+        if c5 not in (-1, 1):
             raise ValueError("RobotController::SetConf invalid value c5={}".format(c5))
-        self.send_string_command(build_command("SetConf",[c1,c3,c5]))
+        self.send_bytes_command(self._CMD_PREFIX["SetConf"],[c1,c3,c5])
         self.update_log_for_motion_commands()
         
     def SetJointAcc(self,p):
@@ -518,9 +599,8 @@ class RobotController:
         Call the SetJointAcc Motion Command
         this methods does not check the response
         """
-        if not (p>=1 and p<=100):
-            raise ValueError("RobotController::SetJointAcc invalid value p={}".format(p))
-        self.send_string_command(build_command("SetJointAcc",[p]))
+        self.check_range("SetJointAcc", "p", p)
+        self.send_bytes_command(self._CMD_PREFIX["SetJointAcc"],[p])
         self.update_log_for_motion_commands()
 
     def SetJointVel(self,p):
@@ -528,9 +608,8 @@ class RobotController:
         Call the SetJointVel Motion Command
         this methods does not check the response
         """
-        if not (p>=0 and p<=100):
-            raise ValueError("RobotController::SetJointVel invalid value p={}".format(p))
-        self.send_string_command(build_command("SetJointVel",[p]))
+        self.check_range("SetJointVel", "p", p)
+        self.send_bytes_command(self._CMD_PREFIX["SetJointVel"],[p])
         self.update_log_for_motion_commands()
 
     def SetTRF(self, origin, orientation):
@@ -545,9 +624,7 @@ class RobotController:
         if not len(orientation)==3:
             raise ValueError("RobotController::SetTRF orientation must have len=3, {} provided".format(len(orientation)))
         
-        args = list(origin)
-        args.extend(orientation)
-        self.send_string_command(build_command("SetTRF",args))
+        self.send_bytes_command(self._CMD_PREFIX["SetTRF"],chain(origin, orientation))
         self.update_log_for_motion_commands()
 
     def SetWRF(self, origin, orientation):
@@ -562,8 +639,6 @@ class RobotController:
         if not len(orientation)==3:
             raise ValueError("RobotController::SetWRF orientation must have len=3, {} provided".format(len(orientation)))
         
-        args = list(origin)
-        args.extend(orientation)
-        self.send_string_command(build_command("SetWRF",args))
+        self.send_bytes_command(self._CMD_PREFIX["SetWRF"],chain(origin, orientation))
         self.update_log_for_motion_commands()
 
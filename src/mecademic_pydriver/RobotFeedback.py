@@ -1,7 +1,6 @@
-import socket
-
 from mecademic_pydriver.MessageReceiver import MessageReceiver
-from mecademic_pydriver.parsingLib import extract_payload_from_messages, payload2tuple
+from mecademic_pydriver.parsingLib import extract_payload_from_messages, extract_payloads_from_messages, payload2array, payload2tuple
+from mecademic_pydriver.socketLib import connect_socket
 
 class RobotFeedback:
     """Class for the Mecademic Robot allowing for live positional 
@@ -10,50 +9,63 @@ class RobotFeedback:
     Attributes:
         Address: IP Address
         socket: socket connecting to physical Mecademic Robot
-        joints: tuple of the joint angles in degrees
-        pose: tuple of the cartesian values in mm and degrees
+        joints: tuple (or array.array, see use_arrays) of the joint angles in degrees
+        pose: tuple (or array.array, see use_arrays) of the cartesian values in mm and degrees
     """
 
-    def __init__(self, address, socket_timeout=0.1):
+    def __init__(self, address, socket_timeout=0.1, busy_poll_us=0, use_arrays=False):
         """Constructor for an instance of the Class Mecademic Robot 
 
         :param address: The IP address associated to the Mecademic Robot
+        :param busy_poll_us: busy poll time in microseconds for the socket receives, 0 to disable (linux only)
+        :param use_arrays: if True, joints and pose are array.array('d') instead of tuples (unboxed floats)
         """
         self.address = address
         self.port = 10001
 
         self.socket = None
         self.socket_timeout = socket_timeout
+        self.busy_poll_us = busy_poll_us
         
+        #the feedback is a continuous stream: a large receive buffer absorbs the bursts
+        #when the application is late reading it
+        self.recv_buffer_size = 256*1024
+
         self.message_receiver = None
-        self.message_terminator = "\x00"
+        self.message_terminator = b"\x00"
 
-        self.joints_fb_code = "2102"
-        self.pose_fb_code = "2103"
+        #feedback messages are parsed as raw bytes, the codes are bytes too
+        self.joints_fb_code = b"2102"
+        self.pose_fb_code = b"2103"
 
         self.joints = ()    #Joint Angles, angles in degrees | [theta_1, theta_2, ... theta_n]
         self.pose = () #Cartesian coordinates, distances in mm, angles in degrees | [x,y,z,alpha,beta,gamma]
 
+        #parser of the joints and pose payloads
+        self._parse_payload = payload2array if use_arrays else payload2tuple
+
     def connect(self):
         """Connects Mecademic Robot object communication to the physical Mecademic Robot
 
         May raise an Exception
         """
         #create a socket and connect
-        self.socket = socket.socket()
-        self.socket.settimeout(self.socket_timeout)
-        self.socket.connect((self.address, self.port))
-        self.socket.settimeout(self.socket_timeout)
-
-        #check that socket is not connected to nothing
-        if self.socket is None:          
-            raise RuntimeError( "RobotFeedback::Connect - socket is None" )
-
-        self.message_receiver = MessageReceiver(self.socket, self.message_terminator)
+        self.socket = connect_socket(
+                        self.address,
+                        self.port,
+                        self.socket_timeout,
+                        recv_buffer_size=self.recv_buffer_size,
+                        busy_poll_us=self.busy_poll_us
+                        )
+
+        self.message_receiver = MessageReceiver(self.socket, self.message_terminator, decode=False)
     
     def disconnect(self):
         """Disconnects Mecademic Robot object from physical Mecademic Robot
         """
+        if(self.message_receiver is not None):
+            self.message_receiver.close()
+            self.message_receiver = None
         if(self.socket is not None):
             self.socket.close()
             self.socket = None        
@@ -70,23 +82,30 @@ class RobotFeedback:
             raise RuntimeError( "RobotFeedback::getData - socket is None" ) #if no connection, nothing to receive
         
         #read message from robot
+        ready = False
         if wait_for_new_messages:
-            self.message_receiver.wait_for_new_messages(timeout)
-        messages = self.message_receiver.get_last_messages(10)
-        messages.reverse() #reverse the messages to get the newer
-
-        if messages:
-            self.set_joints_from_messages(messages)
-            self.set_pose_from_messages(messages)
+            ready = self.message_receiver.wait_for_new_messages(timeout)
+        messages = self.message_receiver.iter_last_messages(10, assume_ready=ready)
+
+        #parse from the newest message, only until both feedback codes are found
+        joints_payload, pose_payload = extract_payloads_from_messages(
+            (self.joints_fb_code, self.pose_fb_code),
+            messages,
+            newest_first=True
+        )
+        if joints_payload is not None:
+            self.joints = self._parse_payload(joints_payload)
+        if pose_payload is not None:
+            self.pose = self._parse_payload(pose_payload)
 
         return self.joints, self.pose
 
     def set_joints_from_messages(self, messages):
         """
-        set joints from message list
-        set the joints using the first occurance in messages
+        set joints from message list (raw bytes messages, see MessageReceiver decode=False)
+        set the joints using the last (newest) occurance in messages
         """
-        self.joints = payload2tuple(
+        self.joints = self._parse_payload(
             extract_payload_from_messages(
                 self.joints_fb_code, 
                 messages
@@ -95,10 +114,10 @@ class RobotFeedback:
 
     def set_pose_from_messages(self, messages):
         """
-        set pose from message list
-        set the pose using the first occurance in messages
+        set pose from message list (raw bytes messages, see MessageReceiver decode=False)
+        set the pose using the last (newest) occurance in messages
         """
-        self.pose = payload2tuple(
+        self.pose = self._parse_payload(
             extract_payload_from_messages(
                 self.pose_fb_code, 
                 messages
@@ -1,74 +1,184 @@
+import re
+from array import array
+from collections import namedtuple
+from functools import lru_cache
 
+#protocol delimiters (start, end, code/payload separator, payload separator)
+#for messages received as str or as raw bytes
+_DELIMITERS = {
+    str: ("[", "]", "][", ","),
+    bytes: (b"[", b"]", b"][", b","),
+}
+
+#[code][payload] as raw bytes: the code ends at the first "][", the payload at the last "]"
+_BYTES_MESSAGE_RE = re.compile(rb"\[(.*?)\]\[(.*)\]\Z", re.DOTALL)
 
 def message2codepayload(message):
     """
     Convert a message in a (code,payload) tuple
     message must be:
     [code][payload]
+    message can be a str or raw bytes, code and payload have the same type of message
     """
+    if type(message) is str:
+        #str messages (controller log): a single find and one char slices
+        #(measured faster than a regex match on str)
+        end_code_index = message.find("][")
+        if end_code_index > 0 and message[:1] == "[" and message[-1:] == "]":
+            return (message[1:end_code_index], message[end_code_index+2:-1])
+    else:
+        #bytes messages (feedback): a single C-level match splits and validates the message
+        match = _BYTES_MESSAGE_RE.match(message)
+        if match is not None:
+            return match.groups()
 
-    if not message.startswith("["):
+    #diagnose the error: one char slices work for both str and bytes (indexing bytes gives an int)
+    start, end, _, _ = _DELIMITERS[type(message)]
+    if message[:1] != start:
         raise ValueError("message2codepayload : invalid start char : {}".format(message))
-    if not message.endswith("]"):
+    if message[-1:] != end:
         raise ValueError("message2codepayload : invalid end char : {}".format(message))
-
-    end_code_index = message.find("][")
-    if end_code_index == -1:
-        raise ValueError("message2codepayload : invalid message : {}".format(message))
-
-    start_payload_index = end_code_index + 2
-
-    code = message[1:end_code_index]
-    payload = message[start_payload_index:-1]
-
-    return (code,payload)
+    raise ValueError("message2codepayload : invalid message : {}".format(message))
 
 def messages2codepayload(messages):
     """
     Convert a list of messages in a list of tuple (code, payload)
     """
-    out = []
-    for message in messages:
-        out.append( message2codepayload(message) )
-    return out
+    return list(map(message2codepayload, messages))
 
 def extract_payload_from_messages(code, messages):
     """
     Extract the payload corresponding to a specific code from message list [message1, message2, ...]
-    Returns the first occurence of the corresponding payload or None 
+    Returns the last (newest) occurence of the corresponding payload or None 
     """
-    payload = None
-    for message in messages:
-        this_code, this_payload = message2codepayload(message)
+    #search from the newest message, stop at the first match
+    parse = message2codepayload #local name lookup in the loop
+    for message in reversed(messages):
+        this_code, this_payload = parse(message)
         if this_code == code:
-            payload = this_payload
-    return payload
+            return this_payload
+    return None
+
+def extract_payloads_from_messages(codes, messages, newest_first=False):
+    """
+    Extract the payloads corresponding to several codes from message list [message1, message2, ...]
+    Returns a list with the last (newest) payload of each code, None for the codes not found
+    The messages are parsed from the newest, the search stops as soon as all the codes are found
+    newest_first : bool (Default False)
+        If true: messages is an iterable already ordered starting from the newer
+        (e.g. MessageReceiver.iter_last_messages)
+    """
+    #position of each code in the output: one dict lookup per message, whatever the number of codes
+    slots = {code: index for index, code in enumerate(codes)}
+    payloads = [None] * len(codes)
+    missing = len(slots)
+    if not newest_first:
+        messages = reversed(messages)
+    #local name lookups in the loop
+    parse = message2codepayload
+    get_slot = slots.get
+    for message in messages:
+        if not missing:
+            break
+        this_code, this_payload = parse(message)
+        index = get_slot(this_code)
+        if index is not None and payloads[index] is None:
+            payloads[index] = this_payload
+            missing -= 1
+    return payloads
 
 def payload2tuple(payload, output_type = float):
     """
     Extract a tuple from a payload message
     usefull for messages that returns an array [a,b,c,d,....]
-    payload: str
+    payload: str or bytes
         the payload to be parsed
     output_type: a type
         the type to use to parse the payload (Default float)
     """
-    splitted_payload = payload.split(',')
-    return tuple((output_type(x) for x in splitted_payload))
-    
-def build_command(cmd, arg_list = []):
+    return tuple(map(output_type, payload.split(_DELIMITERS[type(payload)][3])))
+
+def payload2array(payload, typecode = "d"):
+    """
+    Extract an array.array from a payload message
+    usefull for numeric messages that returns an array [a,b,c,d,....]
+    the values are stored unboxed in a single contiguous buffer
+    payload: str or bytes
+        the payload to be parsed
+    typecode: str
+        the array typecode (Default "d": double)
+    """
+    output_type = float if typecode in "fd" else int
+    return array(typecode, map(output_type, payload.split(_DELIMITERS[type(payload)][3])))
+
+#immutable GetStatusRobot response ("as" is a keyword, the field is as_)
+RobotStatus = namedtuple("RobotStatus", ("as_", "hs", "sm", "es", "pm", "eob", "eom"))
+
+def status_robot_list2dict(status):
+    """
+    Convert the GetStatusRobot response list in a dictionary {'as':as,'hs':hs, ... , 'eom':eom}
+    """
+    return {
+        "as": status[0],
+        "hs": status[1],
+        "sm": status[2],
+        "es": status[3],
+        "pm": status[4],
+        "eob": status[5],
+        "eom": status[6]
+    }
+
+def conf_list2dict(conf):
+    """
+    Convert the GetConf response list in a dictionary {'c1':c1,'c3':c3,'c5':c5}
+    """
+    return {
+        "c1": conf[0],
+        "c3": conf[1],
+        "c5": conf[2]
+    }
+
+@lru_cache(maxsize=8)
+def payload2robot_status(payload):
+    """
+    Parse a GetStatusRobot payload in a RobotStatus namedtuple (as_, hs, sm, es, pm, eob, eom)
+    The result is immutable: identical payloads are parsed only once and share the same object
+    (the status rarely changes between requests)
+    """
+    return RobotStatus._make(payload2tuple(payload, output_type = int))
+
+@lru_cache(maxsize=8)
+def _payload2conf(payload):
+    """
+    Internal function
+    Cached parsing of a GetConf payload
+    """
+    return conf_list2dict(payload2tuple(payload, output_type = int))
+
+def payload2status_robot(payload):
+    """
+    Parse a GetStatusRobot payload in a dictionary {'as':as,'hs':hs, ... , 'eom':eom}
+    Built from the cached RobotStatus (see payload2robot_status), a new dictionary is returned
+    """
+    return status_robot_list2dict(payload2robot_status(payload))
+
+def payload2conf(payload):
+    """
+    Parse a GetConf payload in a dictionary {'c1':c1,'c3':c3,'c5':c5}
+    Identical payloads are parsed only once, a new copy of the dictionary is returned
+    """
+    return dict(_payload2conf(payload))
+
+def build_command(cmd, arg_list = None):
         """
         Builds the command string to send to the Mecademic Robot
         from the function name and arguments the command needs
 
         :param cmd: command name to send to the Mecademic Robot
-        :param arg_list: list of arguments the command requires
+        :param arg_list: list of arguments the command requires (Default None: no arguments)
         :return command: final command for the Mecademic Robot
         """
-        command = cmd
-        if(len(arg_list)!=0):
-            command = command + '('
-            for index in range(0, (len(arg_list)-1)):
-                command = command+str(arg_list[index])+','
-            command = command+str(arg_list[-1])+')'
-        return command
\ No newline at end of file
+        if arg_list is None or len(arg_list)==0:
+            return cmd
+        #single C-level join, the arguments are formatted with str to keep the full precision
+        return "{}({})".format(cmd, ','.join(map(str, arg_list)))
\ No newline at end of file
@@ -0,0 +1,38 @@
+import socket
+import sys
+
+#SO_BUSY_POLL is linux only and is not exported by the socket module: this is its value on linux
+_SO_BUSY_POLL = 46
+
+def connect_socket(address, port, timeout, send_buffer_size=64*1024, recv_buffer_size=64*1024, busy_poll_us=0):
+    """
+    Create a TCP socket tuned for the robot communication and connect it
+
+    :param address: The IP address of the Mecademic Robot
+    :param port: the port to connect to
+    :param timeout: the socket timeout in seconds
+    :param send_buffer_size: size of the kernel send buffer of the socket
+    :param recv_buffer_size: size of the kernel receive buffer of the socket
+    :param busy_poll_us: if > 0, busy poll the device queue for up to busy_poll_us microseconds
+                         on blocking receives (linux only, lowers the latency at the cost of CPU)
+    :return: the connected socket
+
+    May raise an Exception
+    """
+    if busy_poll_us > 0 and not sys.platform.startswith("linux"):
+        raise ValueError("connect_socket : busy_poll_us is supported only on linux, platform is {}".format(sys.platform))
+    sock = socket.socket()
+    try:
+        #disable Nagle: commands and feedback are small messages that must not be delayed
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        #socket buffers are set before connect so that they are used in the TCP window negotiation
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer_size)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer_size)
+        if busy_poll_us > 0:
+            sock.setsockopt(socket.SOL_SOCKET, _SO_BUSY_POLL, busy_poll_us)
+        sock.settimeout(timeout)
+        sock.connect((address, port))
+    except Exception:
+        sock.close()
+        raise
+    return sock
@@ -0,0 +1,120 @@
+import random
+import socket
+import unittest
+from collections import Counter
+
+from mecademic_pydriver.MecademicLog import MecademicLog
+
+
+class TestMecademicLog(unittest.TestCase):
+
+    def setUp(self):
+        self.robot, self.local = socket.socketpair()
+        self.local.settimeout(1.0)
+
+    def tearDown(self):
+        self.robot.close()
+        self.local.close()
+
+    def make_log(self, log_size, on_new_messages_received=None):
+        log = MecademicLog(self.local, log_size=log_size, on_new_messages_received=on_new_messages_received)
+        self.addCleanup(log.close)
+        return log
+
+    def feed(self, log, messages):
+        """
+        Send raw messages ([code][payload]) from the robot side and update the log
+        """
+        self.robot.sendall("".join(message + "\x00" for message in messages).encode("ascii"))
+        log.update_log(wait_for_new_messages=True, timeout=1.0)
+
+    def assertConsistent(self, log, model):
+        self.assertEqual(log.get_log(), model)
+        log._update_counts()
+        self.assertEqual(log._code_counts, Counter(code for code, _ in model))
+        self.assertEqual(log._error_count, sum(code.startswith("1") for code, _ in model))
+        self.assertEqual(log.has_errors(), log._error_count > 0)
+
+    def test_update_log_from_socket(self):
+        log = self.make_log(10)
+        self.robot.sendall(b"[1005][a]\x00[2000][b]\x00")
+        log.update_log(wait_for_new_messages=True, timeout=1.0)
+        self.assertEqual(log.log, [("1005", "a"), ("2000", "b")])
+        self.assertTrue(log.has_errors())
+
+    def test_malformed_message_appends_nothing(self):
+        received = []
+        for callback in (None, received.append):
+            log = self.make_log(10, on_new_messages_received=callback)
+            with self.assertRaises(ValueError):
+                self.feed(log, ["[1][a]", "bad", "[5][x]"])
+            self.assertConsistent(log, [])
+            #the malformed batch is dropped, the next messages are logged
+            self.feed(log, ["[2000][b]"])
+            self.assertConsistent(log, [("2000", "b")])
+            log.close()
+        self.assertEqual(received, [[("2000", "b")]])
+
+    def test_eviction_updates_counts(self):
+        log = self.make_log(3)
+        self.feed(log, ["[1005][a]", "[2000][b]", "[1013][c]", "[2000][d]", "[3000][e]"])
+        self.assertConsistent(log, [("1013", "c"), ("2000", "d"), ("3000", "e")])
+        self.feed(log, ["[2000][f]"])
+        self.assertConsistent(log, [("2000", "d"), ("3000", "e"), ("2000", "f")])
+        self.assertFalse(log.has_errors())
+
+    def test_prefix_search(self):
+        log = self.make_log(10)
+        self.feed(log, ["[1005][a]", "[2000][b]", "[1013][c]", "[2000][d]"])
+        self.assertEqual(log.get_last_code_occurance("1"), ("1013", "c"))
+        self.assertEqual(log.get_last_code_occurance("20", delete_others=True), ("2000", "d"))
+        self.assertIsNone(log.get_last_code_occurance("2000"))
+        self.assertConsistent(log, [("1005", "a")])
+
+    def test_find_last_code_occurances(self):
+        log = self.make_log(10)
+        self.feed(log, ["[1005][a]", "[2029][b]", "[2007][c]", "[2029][d]"])
+        self.assertEqual(log.find_last_code_occurances(("1", "2029", "3000")), [0, 3, -1])
+        self.assertEqual(log.pop_message(3), ("2029", "d"))
+        self.assertConsistent(log, [("1005", "a"), ("2029", "b"), ("2007", "c")])
+
+    def test_random_operations_keep_counts_consistent(self):
+        rng = random.Random(0)
+        codes = ["1005", "1013", "10", "2000", "2001", "2007", "3000"]
+        prefixes = ["1", "10", "1005", "2", "2000", "9"]
+        for log_size in (1, 4, 10):
+            log = self.make_log(log_size)
+            model = []
+            for step in range(500):
+                op = rng.random()
+                if op < 0.45:
+                    messages = [(rng.choice(codes), str(step)) for _ in range(rng.randint(1, 4))]
+                    self.feed(log, ["[{}][{}]".format(*message) for message in messages])
+                    model = (model + messages)[-log_size:]
+                elif op < 0.7:
+                    prefix = rng.choice(prefixes)
+                    delete_others = rng.random() < 0.5
+                    indexes = [i for i, (code, _) in enumerate(model) if code.startswith(prefix)]
+                    expected = model[indexes[-1]] if indexes else None
+                    if indexes:
+                        if delete_others:
+                            model = [message for message in model if not message[0].startswith(prefix)]
+                        else:
+                            del model[indexes[-1]]
+                    self.assertEqual(log.get_last_code_occurance(prefix, delete_others), expected)
+                elif op < 0.85:
+                    removed = tuple(rng.sample(prefixes, 2))
+                    log.remove_all_codes(removed)
+                    model = [message for message in model if not message[0].startswith(removed)]
+                elif op < 0.92:
+                    self.assertEqual(log.get_first_message(), model.pop(0) if model else None)
+                elif op < 0.99:
+                    self.assertEqual(log.get_last_message(), model.pop() if model else None)
+                else:
+                    log.clear_log()
+                    model = []
+                self.assertConsistent(log, model)
+
+
+if __name__ == "__main__":
+    unittest.main()
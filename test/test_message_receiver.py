@@ -0,0 +1,95 @@
+import socket
+import unittest
+
+from mecademic_pydriver.MessageReceiver import MessageReceiver
+
+
+class TestMessageReceiver(unittest.TestCase):
+
+    def setUp(self):
+        self.robot, self.local = socket.socketpair()
+        self.local.settimeout(1.0)
+
+    def tearDown(self):
+        self.robot.close()
+        self.local.close()
+
+    def receiver(self, **kwargs):
+        receiver = MessageReceiver(self.local, **kwargs)
+        self.addCleanup(receiver.close)
+        return receiver
+
+    def feed(self, receiver, data):
+        """
+        Send data and receive it all, return the messages in the queue
+        """
+        self.robot.sendall(data)
+        received = 0
+        while received < len(data):
+            received += receiver._MessageReceiver__recv_internal(len(data) - received)
+        receiver.parse_buffer()
+        return receiver.get_all_messages(recv_all=False)
+
+    def test_framing_across_split_recvs(self):
+        receiver = self.receiver()
+        data = b"[2000][a]\x00[2001][bb]\x00[3000][ccc]\x00"
+        messages = []
+        for index in range(len(data)):
+            messages += self.feed(receiver, data[index:index+1])
+        self.assertEqual(messages, ["[2000][a]", "[2001][bb]", "[3000][ccc]"])
+
+    def test_multi_byte_terminator_split(self):
+        receiver = self.receiver(message_terminator=b"\r\n")
+        self.assertEqual(self.feed(receiver, b"[1][a]\r"), [])
+        self.assertEqual(self.feed(receiver, b"\n[2][b"), ["[1][a]"])
+        self.assertEqual(self.feed(receiver, b"]\r\n"), ["[2][b]"])
+
+    def test_raw_bytes(self):
+        receiver = self.receiver(message_terminator=b"\x00", decode=False)
+        self.assertEqual(self.feed(receiver, b"[2102][1,2]\x00[2103][3]\x00"), [b"[2102][1,2]", b"[2103][3]"])
+
+    def test_compaction_keeps_buffer_bounded(self):
+        receiver = self.receiver(buffer_size=64)
+        expected = []
+        messages = []
+        for index in range(500):
+            message = "[{}][{}]".format(index, "x" * (index % 20))
+            expected.append(message)
+            #an incomplete message is left pending in the buffer on each call
+            data = (message + "\x00").encode("ascii")
+            messages += self.feed(receiver, data[:5])
+            messages += self.feed(receiver, data[5:])
+        self.assertEqual(messages, expected)
+        #the pending bytes are moved to the start instead of growing the buffer
+        self.assertEqual(len(receiver.buffer), 64)
+
+    def test_growth_for_large_message(self):
+        receiver = self.receiver(buffer_size=16)
+        message = "[3000][" + "y" * 1000 + "]"
+        self.assertEqual(self.feed(receiver, message.encode("ascii")[:500]), [])
+        self.assertEqual(self.feed(receiver, (message[500:] + "\x00[1][z]\x00").encode("ascii")), [message, "[1][z]"])
+        self.assertEqual(self.feed(receiver, b"[2][w]\x00"), ["[2][w]"])
+
+    def test_undecodable_frame_is_consumed(self):
+        receiver = self.receiver()
+        self.robot.sendall("[3000][café]\x00".encode("utf-8"))
+        with self.assertRaises(UnicodeDecodeError):
+            receiver.recv_all()
+        self.robot.sendall(b"[2000][ok]\x00")
+        self.assertEqual(receiver.get_all_messages(), ["[2000][ok]"])
+
+    def test_get_last_messages(self):
+        receiver = self.receiver()
+        self.robot.sendall(b"[1][a]\x00[2][b]\x00[3][c]\x00")
+        self.assertEqual(receiver.get_last_messages(2), ["[2][b]", "[3][c]"])
+        self.assertEqual(receiver.get_all_messages(), [])
+
+    def test_iter_last_messages_newest_first(self):
+        receiver = self.receiver()
+        self.robot.sendall(b"[1][a]\x00[2][b]\x00[3][c]\x00")
+        self.assertEqual(list(receiver.iter_last_messages(2)), ["[3][c]", "[2][b]"])
+        self.assertEqual(receiver.get_all_messages(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
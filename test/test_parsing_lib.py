@@ -0,0 +1,44 @@
+import unittest
+
+from mecademic_pydriver.parsingLib import message2codepayload
+
+
+class TestMessage2CodePayload(unittest.TestCase):
+
+    def test_str_message(self):
+        self.assertEqual(message2codepayload("[2007][0,0,0,0,1,1,1]"), ("2007", "0,0,0,0,1,1,1"))
+        self.assertEqual(message2codepayload("[3000][]"), ("3000", ""))
+        self.assertEqual(message2codepayload("[][x]"), ("", "x"))
+
+    def test_bytes_message(self):
+        self.assertEqual(message2codepayload(b"[2102][1.5,-2,3]"), (b"2102", b"1.5,-2,3"))
+        self.assertEqual(message2codepayload(b"[3000][]"), (b"3000", b""))
+        self.assertEqual(message2codepayload(b"[][x]"), (b"", b"x"))
+
+    def test_split_on_first_separator(self):
+        for message in ("[1][a][b]", "[1]][x]", "[1][a]]"):
+            expected = message2codepayload(message)
+            #the payload keeps any further bracket, str and bytes agree
+            self.assertEqual(
+                message2codepayload(message.encode("ascii")),
+                tuple(part.encode("ascii") for part in expected)
+                )
+        self.assertEqual(message2codepayload("[1][a][b]"), ("1", "a][b"))
+        self.assertEqual(message2codepayload("[1]][x]"), ("1]", "x"))
+
+    def test_invalid_messages(self):
+        cases = (
+            ("", "invalid start char"),
+            ("x[1][a]", "invalid start char"),
+            ("[1][a]x", "invalid end char"),
+            ("[1]", "invalid message"),
+            ("[1[a]", "invalid message"),
+            )
+        for message, error in cases:
+            for raw in (message, message.encode("ascii")):
+                with self.assertRaisesRegex(ValueError, error):
+                    message2codepayload(raw)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import random
+import unittest
+from collections import deque
+
+from mecademic_pydriver.RingLog import RingLog
+
+
+def make_wrapped(maxlen, num_items):
+    """
+    Return a RingLog filled with range(num_items), wrapped around if num_items > maxlen
+    """
+    ring = RingLog(maxlen)
+    ring.extend(range(num_items))
+    return ring
+
+
+class TestRingLog(unittest.TestCase):
+
+    def test_append_drops_oldest(self):
+        ring = make_wrapped(4, 7)
+        self.assertEqual(len(ring), 4)
+        self.assertEqual(list(ring), [3, 4, 5, 6])
+
+    def test_getitem_wraparound(self):
+        ring = make_wrapped(4, 6)
+        self.assertEqual([ring[i] for i in range(4)], [2, 3, 4, 5])
+        self.assertEqual([ring[-i] for i in range(1, 5)], [5, 4, 3, 2])
+        with self.assertRaises(IndexError):
+            ring[4]
+        with self.assertRaises(IndexError):
+            ring[-5]
+
+    def test_reversed_wraparound(self):
+        self.assertEqual(list(reversed(make_wrapped(4, 6))), [5, 4, 3, 2])
+        self.assertEqual(list(reversed(make_wrapped(4, 3))), [2, 1, 0])
+        self.assertEqual(list(reversed(RingLog(4))), [])
+
+    def test_delitem_wraparound(self):
+        for index in range(-4, 4):
+            ring = make_wrapped(4, 6)
+            expected = [2, 3, 4, 5]
+            del ring[index]
+            del expected[index]
+            self.assertEqual(list(ring), expected)
+            # the freed slot is reused by the next append
+            ring.append(6)
+            expected.append(6)
+            self.assertEqual(list(ring), expected)
+
+    def test_rindex(self):
+        ring = RingLog(5)
+        ring.extend(["a", "b", "a", "c", "b", "a", "d"])  # stored: a c b a d (wrapped)
+        self.assertEqual(list(ring), ["a", "c", "b", "a", "d"])
+        self.assertEqual(ring.rindex("a"), 3)
+        self.assertEqual(ring.rindex("c"), 1)
+        self.assertEqual(ring.rindex("d"), 4)
+        with self.assertRaises(ValueError):
+            ring.rindex("x")
+
+    def test_pop_popleft_clear(self):
+        ring = make_wrapped(3, 5)
+        self.assertEqual(ring.popleft(), 2)
+        self.assertEqual(ring.pop(), 4)
+        self.assertEqual(list(ring), [3])
+        ring.clear()
+        self.assertEqual(len(ring), 0)
+        with self.assertRaises(IndexError):
+            ring.pop()
+        with self.assertRaises(IndexError):
+            ring.popleft()
+
+    def test_extend_wraparound(self):
+        for num_items in range(10):
+            for batch in range(7):
+                ring = make_wrapped(5, num_items)
+                model = deque(range(num_items), maxlen=5)
+                items = ["x{}".format(k) for k in range(batch)]
+                ring.extend(items)
+                model.extend(items)
+                self.assertEqual(list(ring), list(model))
+                #the next append goes after the batch
+                ring.append("y")
+                model.append("y")
+                self.assertEqual(list(ring), list(model))
+
+    def test_zero_maxlen(self):
+        ring = make_wrapped(0, 3)
+        self.assertEqual(len(ring), 0)
+        self.assertEqual(list(ring), [])
+
+    def test_random_operations_match_deque(self):
+        rng = random.Random(0)
+        for maxlen in (1, 2, 3, 5, 8):
+            ring = RingLog(maxlen)
+            model = deque(maxlen=maxlen)
+            for step in range(2000):
+                op = rng.random()
+                if op < 0.4:
+                    ring.append(step)
+                    model.append(step)
+                elif op < 0.5:
+                    items = range(step, step + rng.randint(0, 2 * maxlen))
+                    ring.extend(items)
+                    model.extend(items)
+                elif op < 0.65 and model:
+                    self.assertEqual(ring.popleft(), model.popleft())
+                elif op < 0.8 and model:
+                    self.assertEqual(ring.pop(), model.pop())
+                elif op < 0.95 and model:
+                    index = rng.randrange(-len(model), len(model))
+                    del ring[index]
+                    del model[index]
+                elif model:
+                    value = rng.choice(model)
+                    self.assertEqual(ring.rindex(value), len(model) - 1 - list(reversed(model)).index(value))
+                self.assertEqual(list(ring), list(model))
+                self.assertEqual(list(reversed(ring)), list(reversed(model)))
+
+
+if __name__ == "__main__":
+    unittest.main()
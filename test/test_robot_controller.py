@@ -0,0 +1,121 @@
+import io
+import socket
+import unittest
+from contextlib import redirect_stdout
+
+from mecademic_pydriver.MecademicLog import MecademicLog
+from mecademic_pydriver.RobotController import RobotController
+
+
+class RecordingSocket:
+    """
+    Socket stub that records the data of each sendall call
+    on_send(data), if provided, is called after each sendall (e.g. to send the robot reply)
+    """
+
+    def __init__(self, on_send=None):
+        self.sent = []
+        self.on_send = on_send
+
+    def sendall(self, data):
+        self.sent.append(bytes(data))
+        if self.on_send:
+            self.on_send(data)
+
+
+class TestRobotController(unittest.TestCase):
+
+    def setUp(self):
+        self.robot, self.local = socket.socketpair()
+        self.local.settimeout(1.0)
+        self.controller = RobotController("127.0.0.1")
+        self.controller.socket = RecordingSocket()
+        self.controller.mecademic_log = MecademicLog(self.local, log_size=10)
+
+    def tearDown(self):
+        self.controller.mecademic_log.close()
+        self.robot.close()
+        self.local.close()
+
+    def test_move_joints_batch_chunks_on_command_boundaries(self):
+        command = b"MoveJoints(1,2,3,4,5,6)\0"
+        #room for two commands per chunk
+        self.controller._TX_BATCH_CHUNK_SIZE = 2 * len(command) + 1
+        self.controller.MoveJointsBatch([[1, 2, 3, 4, 5, 6]] * 5)
+        self.assertEqual(self.controller.socket.sent, [command * 2, command * 2, command])
+
+    def test_move_joints_batch_oversized_command(self):
+        self.controller._TX_BATCH_CHUNK_SIZE = 8
+        self.controller.MoveJointsBatch([[1, 2, 3, 4, 5, 6], [7, 8, 9, 10, 11, 12]])
+        self.assertEqual(
+            self.controller.socket.sent,
+            [b"MoveJoints(1,2,3,4,5,6)\0", b"MoveJoints(7,8,9,10,11,12)\0"]
+            )
+
+    def test_move_joints_batch_validates_before_sending(self):
+        with self.assertRaises(ValueError):
+            self.controller.MoveJointsBatch([[1, 2, 3, 4, 5, 6], [1, 2, 3]])
+        self.assertEqual(self.controller.socket.sent, [])
+
+    def test_check_range_bounds(self):
+        #SetCartAcc: (1, 100], SetJointAcc: [1, 100]
+        for method_str, valid, invalid in (
+                ("SetCartAcc", (1.001, 50, 100), (1, 0, 100.5)),
+                ("SetJointAcc", (1, 50, 100), (0.999, 100.001)),
+                ):
+            for value in valid:
+                self.controller.check_range(method_str, "p", value)
+            for value in invalid:
+                with self.assertRaisesRegex(ValueError, "RobotController::{} invalid value p=".format(method_str)):
+                    self.controller.check_range(method_str, "p", value)
+
+    def test_set_command_out_of_range_is_not_sent(self):
+        with self.assertRaises(ValueError):
+            self.controller.SetCartAcc(1)
+        self.controller.SetCartAcc(100)
+        self.assertEqual(self.controller.socket.sent, [b"SetCartAcc(100)\0"])
+
+    def reply_with(self, *replies):
+        """
+        Make the robot send the next reply after each command
+        """
+        replies = list(replies)
+        self.controller.socket.on_send = lambda data: self.robot.sendall(replies.pop(0))
+
+    def test_request_error_is_raised(self):
+        self.reply_with(b"[1005][error]\0[2029][1,-1,1]\0")
+        with self.assertRaisesRegex(RuntimeError, r"RobotController::GetConf \('1005', 'error'\)"):
+            self.controller.GetConf()
+        #the error is removed from the log, the response is left
+        self.assertEqual(self.controller.mecademic_log.get_log(), [("2029", "1,-1,1")])
+
+    def test_request_errors_not_handled(self):
+        self.reply_with(b"[1005][error]\0[2007][1,1,0,0,0,1,1]\0")
+        status = self.controller.GetStatusRobot(as_namedtuple=True)
+        self.assertEqual(status, (1, 1, 0, 0, 0, 1, 1))
+        self.assertEqual(self.controller.mecademic_log.get_log(), [("1005", "error")])
+
+    def test_request_retry(self):
+        self.reply_with(b"[3000][other]\0", b"[2029][1,-1,1]\0[2029][1,1,1]\0")
+        with redirect_stdout(io.StringIO()) as out:
+            conf = self.controller.GetConf()
+        self.assertIn("RobotController::GetConf response not received, retry", out.getvalue())
+        #the last response is returned, all the others are removed
+        self.assertEqual(conf, {"c1": 1, "c3": 1, "c5": 1})
+        self.assertEqual(self.controller.socket.sent, [b"GetConf\0", b"GetConf\0"])
+        self.assertEqual(self.controller.mecademic_log.get_log(), [("3000", "other")])
+
+    def test_request_no_response(self):
+        self.reply_with(b"[3000][a]\0", b"[3000][b]\0")
+        with redirect_stdout(io.StringIO()):
+            msg = self.controller.get_request_response("GetConf", "2029", method_str="GetConf")
+        self.assertIsNone(msg)
+        self.assertEqual(len(self.controller.socket.sent), 2)
+        #without retry a single request is sent
+        self.reply_with(b"[3000][c]\0")
+        self.assertIsNone(self.controller.get_request_response("GetConf", "2029", retry=False))
+        self.assertEqual(len(self.controller.socket.sent), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import socket
+import unittest
+from array import array
+
+from mecademic_pydriver.MessageReceiver import MessageReceiver
+from mecademic_pydriver.RobotFeedback import RobotFeedback
+
+
+class TestRobotFeedback(unittest.TestCase):
+
+    def setUp(self):
+        self.robot, self.local = socket.socketpair()
+        self.local.settimeout(1.0)
+
+    def tearDown(self):
+        self.robot.close()
+        self.local.close()
+
+    def feedback(self, **kwargs):
+        feedback = RobotFeedback("127.0.0.1", **kwargs)
+        feedback.socket = self.local
+        feedback.message_receiver = MessageReceiver(self.local, feedback.message_terminator, decode=False)
+        self.addCleanup(feedback.message_receiver.close)
+        return feedback
+
+    def test_get_data_uses_newest_messages(self):
+        feedback = self.feedback()
+        self.robot.sendall(
+            b"[2102][1,1,1,1,1,1]\x00[2103][1,2,3,4,5,6]\x00"
+            b"[2102][2,2,2,2,2,2]\x00[3000][x]\x00"
+            )
+        joints, pose = feedback.get_data(timeout=1.0)
+        self.assertEqual(joints, (2, 2, 2, 2, 2, 2))
+        self.assertEqual(pose, (1, 2, 3, 4, 5, 6))
+
+    def test_get_data_stops_at_newest_codes(self):
+        feedback = self.feedback()
+        #the older malformed message is never parsed
+        self.robot.sendall(b"garbage\x00[2103][0,0,0,0,0,0]\x00[2102][3,3,3,3,3,3]\x00")
+        self.assertEqual(feedback.get_data(timeout=1.0), ((3, 3, 3, 3, 3, 3), (0, 0, 0, 0, 0, 0)))
+
+    def test_get_data_keeps_missing_values(self):
+        feedback = self.feedback(use_arrays=True)
+        self.robot.sendall(b"[2102][1,2,3,4,5,6]\x00[2103][6,5,4,3,2,1]\x00")
+        feedback.get_data(timeout=1.0)
+        self.robot.sendall(b"[2103][0,0,0,0,0,1]\x00")
+        joints, pose = feedback.get_data(timeout=1.0)
+        self.assertEqual(joints, array("d", [1, 2, 3, 4, 5, 6]))
+        self.assertEqual(pose, array("d", [0, 0, 0, 0, 0, 1]))
+
+
+if __name__ == "__main__":
+    unittest.main()